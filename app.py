@@ -5,17 +5,117 @@ translated into histopathology-relevant tissue descriptors.
 
 import streamlit as st
 from PIL import Image
+import hashlib
 import io
+import numpy as np
 from data import (
-    PATIENTS,
-    ROI_OPTIONS,
+    CACHE_TTL,
+    PATIENTS_BY_LABEL,
+    PATIENT_LABELS,
+    ROI_BY_ID,
+    ROI_IDS,
     REFERENCE,
     get_descriptors,
     get_explanation,
-    create_placeholder_image,
+    create_placeholder_array,
 )
 
-# Persist uploaded images per (biopsy_id, modality)
+# Longest side kept for uploads; larger images are downscaled before being stored
+MAX_UPLOAD_SIDE = 1024
+# Upload-derived cache entries are shared across sessions; keep only the most recent few
+UPLOAD_CACHE_ENTRIES = 32
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=UPLOAD_CACHE_ENTRIES, show_spinner=False)
+def normalize_upload(digest: str, _raw: bytes) -> bytes:
+    """Return browser-ready bytes for an upload, capped at MAX_UPLOAD_SIDE (cached by content digest)."""
+    img = Image.open(io.BytesIO(_raw))
+    fmt = img.format
+    # Browsers render PNG/JPEG as-is; re-encode anything else (e.g. TIFF) or anything too large
+    if fmt in ("PNG", "JPEG") and max(img.size) <= MAX_UPLOAD_SIDE:
+        # Decode fully so truncated or corrupt files fail here, inside the uploader's try
+        img.load()
+        return _raw
+    # Let the JPEG decoder downscale during decode (DCT scaling); no-op for other formats
+    img.draft("RGB", (MAX_UPLOAD_SIDE, MAX_UPLOAD_SIDE))
+    img = img.convert("RGB")
+    img.thumbnail((MAX_UPLOAD_SIDE, MAX_UPLOAD_SIDE), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    # Keep photographic JPEGs as JPEG; PNG only for formats browsers can't show (e.g. TIFF)
+    if fmt == "JPEG":
+        img.save(buf, format="JPEG", quality=90)
+    else:
+        img.save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+
+# Modalities in display order; placeholders use PLACEHOLDER_SIZE's aspect ratio
+MODALITIES = [
+    ("MPM-FLIM", "Multiphoton FLIM (fluorescence lifetime)"),
+    ("confocal", "Confocal reflectance"),
+    ("RCM", "Reflectance confocal microscopy"),
+]
+PLACEHOLDER_SIZE = (320, 240)
+TILE_GAP = 4
+
+
+def fit_tile(img: Image.Image, height: int) -> np.ndarray:
+    """Scale an image to fit within (MAX_UPLOAD_SIDE, height) and letterbox it to that height."""
+    scale = min(height / img.height, MAX_UPLOAD_SIDE / img.width)
+    if scale != 1:
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        img = img.resize(size, Image.Resampling.LANCZOS)
+    tile = np.asarray(img)
+    if tile.shape[0] == height:
+        return tile
+    out = np.full((height, tile.shape[1], 3), 255, dtype=np.uint8)
+    top = (height - tile.shape[0]) // 2
+    out[top:top + tile.shape[0]] = tile
+    return out
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=UPLOAD_CACHE_ENTRIES, show_spinner=False)
+def build_composite(biopsy_id: str, upload_digests: tuple, _uploads: tuple) -> tuple:
+    """Lay out one tile per modality side by side as a single PNG (upload if given, else placeholder).
+
+    The row is as tall as the tallest upload (already capped at MAX_UPLOAD_SIDE), so uploads are
+    never upscaled; each tile is at most MAX_UPLOAD_SIDE wide. Returns (png_bytes, tile_widths,
+    from_upload flags).
+    """
+    decoded = {}
+    for (mod, _), raw in zip(MODALITIES, _uploads):
+        if raw is None:
+            continue
+        try:
+            decoded[mod] = Image.open(io.BytesIO(raw)).convert("RGB")
+        except Exception:
+            pass  # Unreadable upload: show the placeholder instead of failing the page
+    height = min(
+        max((img.height for img in decoded.values()), default=PLACEHOLDER_SIZE[1]), MAX_UPLOAD_SIDE
+    )
+    gap = np.full((height, TILE_GAP, 3), 255, dtype=np.uint8)
+    parts, widths = [], []
+    for mod, _ in MODALITIES:
+        img = decoded.get(mod)
+        if img is None:
+            # Placeholders are only generated (and cached) at PLACEHOLDER_SIZE; stretch to the row
+            tile = create_placeholder_array(mod, *PLACEHOLDER_SIZE, biopsy_id=biopsy_id)
+            if height != PLACEHOLDER_SIZE[1]:
+                width = min(round(PLACEHOLDER_SIZE[0] * height / PLACEHOLDER_SIZE[1]), MAX_UPLOAD_SIDE)
+                tile = Image.fromarray(tile).resize((width, height), Image.Resampling.BILINEAR)
+                tile = np.asarray(tile)
+        else:
+            tile = fit_tile(img, height)
+        if parts:
+            parts.append(gap)
+        parts.append(tile)
+        widths.append(tile.shape[1])
+    buf = io.BytesIO()
+    Image.fromarray(np.concatenate(parts, axis=1)).save(buf, format="PNG", compress_level=1)
+    return buf.getvalue(), widths, tuple(mod in decoded for mod, _ in MODALITIES)
+
+
+# Persist uploaded images as (digest, bytes) per (biopsy_id, modality)
 if "uploaded_images" not in st.session_state:
     st.session_state["uploaded_images"] = {}
 
@@ -34,6 +134,8 @@ st.markdown("""
     .metric-card { background: #f7fafc; border-radius: 8px; padding: 1rem; margin: 0.5rem 0; border-left: 4px solid #3182ce; }
     .ref-range { font-size: 0.85rem; color: #718096; }
     .explanation { font-size: 0.9rem; color: #2d3748; line-height: 1.5; padding: 0.5rem 0; }
+    .bar-wrap { background: #e2e8f0; border-radius: 4px; height: 0.5rem; margin: 0.25rem 0 0.5rem; overflow: hidden; }
+    .bar { background: #3182ce; height: 100%; }
     div[data-testid="stSidebar"] { background: #edf2f7; }
 </style>
 """, unsafe_allow_html=True)
@@ -49,21 +151,21 @@ st.markdown(
 # ——— Sidebar: patient & biopsy selection ———
 with st.sidebar:
     st.header("Case selection")
-    patient_options = [p["label"] for p in PATIENTS]
-    patient_choice = st.selectbox("Patient", patient_options, key="patient")
-    patient = next(p for p in PATIENTS if p["label"] == patient_choice)
+    patient_choice = st.selectbox("Patient", PATIENT_LABELS, key="patient")
+    patient = PATIENTS_BY_LABEL[patient_choice]
     biopsy_options = patient["biopsies"]
     biopsy_choice = st.selectbox("Biopsy", biopsy_options, key="biopsy")
     st.divider()
     st.header("Region of interest")
     roi_choice = st.radio(
         "Select ROI",
-        options=[r["id"] for r in ROI_OPTIONS],
-        format_func=lambda x: next(r["label"] for r in ROI_OPTIONS if r["id"] == x),
+        options=ROI_IDS,
+        format_func=lambda x: ROI_BY_ID[x]["label"],
         key="roi",
     )
-    roi_label = next(r["label"] for r in ROI_OPTIONS if r["id"] == roi_choice)
-    st.caption(next(r["description"] for r in ROI_OPTIONS if r["id"] == roi_choice))
+    roi = ROI_BY_ID[roi_choice]
+    roi_label = roi["label"]
+    st.caption(roi["description"])
     st.divider()
     st.header("Upload your data")
     st.caption("Upload images for the selected biopsy. They will replace placeholders below.")
@@ -73,53 +175,60 @@ with st.sidebar:
         f = st.file_uploader(mod_name, type=["png", "jpg", "jpeg", "tif", "tiff"], key=f"up_{biopsy_choice}_{mod_key}")
         if f is not None:
             try:
-                img = Image.open(io.BytesIO(f.read())).convert("RGB")
-                st.session_state["uploaded_images"][key] = img
+                raw = f.getvalue()
+                digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+                # Same file still attached on a rerun: already normalized, skip the decode
+                if st.session_state["uploaded_images"].get(key, (None,))[0] == digest:
+                    continue
+                st.session_state["uploaded_images"][key] = (digest, normalize_upload(digest, raw))
             except Exception as e:
                 st.error(f"Could not load {mod_name}: {e}")
     if st.button("Clear uploaded images for this biopsy", use_container_width=True):
-        for k in list(st.session_state["uploaded_images"].keys()):
-            if k[0] == biopsy_choice:
-                del st.session_state["uploaded_images"][k]
+        st.session_state["uploaded_images"] = {
+            k: v for k, v in st.session_state["uploaded_images"].items() if k[0] != biopsy_choice
+        }
         st.rerun()
     st.divider()
     st.caption("Descriptors update when you change case or ROI.")
 
 # ——— Multimodal images side-by-side ———
 st.subheader("Multimodal imaging")
-modalities = [
-    ("MPM-FLIM", "Multiphoton FLIM (fluorescence lifetime)"),
-    ("confocal", "Confocal reflectance"),
-    ("RCM", "Reflectance confocal microscopy"),
-]
-cols = st.columns(3)
-for col, (mod, desc) in zip(cols, modalities):
-    with col:
-        key = (biopsy_choice, mod)
-        if key in st.session_state.get("uploaded_images", {}):
-            img = st.session_state["uploaded_images"][key]
-            st.image(img, use_container_width=True, caption=f"{desc} (your upload)")
-        else:
-            img = create_placeholder_image(mod, biopsy_id=biopsy_choice)
-            st.image(img, use_container_width=True, caption=desc)
+uploads = [st.session_state["uploaded_images"].get((biopsy_choice, mod)) for mod, _ in MODALITIES]
+composite, tile_widths, from_upload = build_composite(
+    biopsy_choice,
+    tuple(u[0] if u else None for u in uploads),
+    tuple(u[1] if u else None for u in uploads),
+)
+st.image(composite, use_container_width=True)
+# Caption columns sized like the tiles so each caption sits under its image
+for col, (_, desc), is_upload in zip(st.columns(tile_widths), MODALITIES, from_upload):
+    col.caption(f"{desc} (your upload)" if is_upload else desc)
 
 # ——— Descriptors: quantitative values, explanations, reference comparison ———
 descriptors = get_descriptors(biopsy_choice, roi_choice)
 st.divider()
 st.subheader(f"Tissue descriptors — ROI: {roi_label}")
 
-for key, value in descriptors.items():
+# Batch the range math, then emit every descriptor row in one markdown call
+keys = list(descriptors)
+vals = np.fromiter(descriptors.values(), dtype=float, count=len(keys))
+lows = np.array([REFERENCE[k]["min"] for k in keys])
+highs = np.array([REFERENCE[k]["max"] for k in keys])
+spans = highs - lows
+pcts = np.divide(vals - lows, spans, out=np.full_like(vals, 0.5), where=spans > 0).clip(0, 1)
+
+rows = []
+for key, value, low, high, pct in zip(keys, vals.tolist(), lows.tolist(), highs.tolist(), pcts.tolist()):
     ref = REFERENCE[key]
     explanation = get_explanation(key, value, ref)
-    low, high = ref["min"], ref["max"]
-    pct = (value - low) / (high - low) if high > low else 0.5
-    pct = max(0, min(1, pct))
-
-    st.markdown(f"**{ref['label']}**")
-    st.progress(pct)
-    st.caption(f"Value: **{value:.2f}** {ref['unit']} — Reference range: {low:.2f}–{high:.2f}")
-    st.markdown(f'<p class="explanation">{explanation}</p>', unsafe_allow_html=True)
-    st.markdown("---")
+    rows.append(
+        f'<p><strong>{ref["label"]}</strong></p>'
+        f'<div class="bar-wrap"><div class="bar" style="width:{pct * 100:.1f}%"></div></div>'
+        f'<p class="ref-range">Value: <strong>{value:.2f}</strong> {ref["unit"]} — '
+        f"Reference range: {low:.2f}–{high:.2f}</p>"
+        f'<p class="explanation">{explanation}</p><hr>'
+    )
+st.markdown("".join(rows), unsafe_allow_html=True)
 
 st.info(
     "These descriptors are derived from interpretable machine-learning models applied to "
@@ -1,8 +1,13 @@
 """Mock data for OPTIC-DERM Explorer prototype."""
 
-import io
+import functools
+import zlib
+
 import numpy as np
-from PIL import Image
+import streamlit as st
+
+# Cached results are pure functions of their arguments; keep them for a day
+CACHE_TTL = 24 * 60 * 60
 
 # Patient/biopsy catalog
 PATIENTS = [
@@ -10,6 +15,10 @@ PATIENTS = [
     {"id": "P002", "label": "Patient 002", "biopsies": ["B002-A"]},
     {"id": "P003", "label": "Patient 003", "biopsies": ["B003-A", "B003-B", "B003-C"]},
 ]
+PATIENTS_BY_ID = {p["id"]: p for p in PATIENTS}
+PATIENTS_BY_LABEL = {p["label"]: p for p in PATIENTS}
+PATIENT_IDS = [p["id"] for p in PATIENTS]
+PATIENT_LABELS = [p["label"] for p in PATIENTS]
 
 # ROI options (user "selects" a region)
 ROI_OPTIONS = [
@@ -17,6 +26,9 @@ ROI_OPTIONS = [
     {"id": "dermis", "label": "Dermis", "description": "Middle layer"},
     {"id": "lesion_center", "label": "Lesion center", "description": "Center of imaged lesion"},
 ]
+ROI_BY_ID = {r["id"]: r for r in ROI_OPTIONS}
+ROI_IDS = [r["id"] for r in ROI_OPTIONS]
+ROI_LABELS = [r["label"] for r in ROI_OPTIONS]
 
 # Normal reference ranges for descriptors (for comparison)
 REFERENCE = {
@@ -25,16 +37,39 @@ REFERENCE = {
     "tissue_organization": {"min": 0.50, "max": 0.90, "unit": "score", "label": "Tissue organization"},
 }
 
+def _seeded_rng(*parts: str) -> np.random.Generator:
+    """Generator seeded deterministically from string identifiers (stable across processes)."""
+    return np.random.default_rng(np.random.SeedSequence([zlib.crc32(p.encode()) for p in parts]))
+
+
+@functools.lru_cache(maxsize=8)
+def _gradient_factor_q8(height: int) -> np.ndarray:
+    """Vertical "tissue-like" gradient 0.7 -> 1.0 in 8.8 fixed point, shape (H, 1, 1), read-only."""
+    y = np.linspace(0, 1, height).reshape(-1, 1, 1)
+    factor_q8 = ((0.7 + 0.3 * y) * 256).astype(np.uint16)
+    factor_q8.setflags(write=False)
+    return factor_q8
+
+
+def _apply_gradient(arr: np.ndarray) -> np.ndarray:
+    """Shade an (H, W, C) uint8 image with the "tissue-like" gradient (C may be 1 or 3)."""
+    # factor is in [0.7, 1.0], so the product never exceeds 255 and no clip is needed
+    return ((arr.astype(np.uint16) * _gradient_factor_q8(arr.shape[0])) >> 8).astype(np.uint8)
+
+
+@functools.lru_cache(maxsize=256)
+def _descriptors_cached(biopsy_id: str, roi_id: str) -> tuple:
+    """Descriptor values in REFERENCE order; immutable so the memoized result can be shared."""
+    rng = _seeded_rng(biopsy_id, roi_id)
+    # One draw per REFERENCE key, in order: keratin, metabolic, organization
+    return tuple(rng.uniform([0.12, 0.28, 0.40], [0.62, 0.82, 0.95]).tolist())
+
+
 # Mock descriptors per biopsy and ROI (interpretable ML outputs)
 def get_descriptors(biopsy_id: str, roi_id: str) -> dict:
     """Return quantitative descriptors for a biopsy and ROI (mock)."""
-    # Vary slightly by biopsy and ROI for demo
-    rng = np.random.RandomState(hash(biopsy_id + roi_id) % 2**32)
-    return {
-        "keratin_dominance": float(rng.uniform(0.12, 0.62)),
-        "metabolic_state": float(rng.uniform(0.28, 0.82)),
-        "tissue_organization": float(rng.uniform(0.40, 0.95)),
-    }
+    # Vary slightly by biopsy and ROI for demo; fresh dict so callers can't mutate the cache
+    return dict(zip(REFERENCE, _descriptors_cached(biopsy_id, roi_id)))
 
 
 def get_explanation(descriptor_key: str, value: float, ref: dict) -> str:
@@ -52,30 +87,29 @@ def get_explanation(descriptor_key: str, value: float, ref: dict) -> str:
     return f"{ref['label']}: {value:.2f} ({comp}). {meaning}"
 
 
-def create_placeholder_image(
+@st.cache_data(ttl=CACHE_TTL, max_entries=64, show_spinner=False)
+def create_placeholder_array(
     modality: str, width: int = 320, height: int = 240, biopsy_id: str = ""
-) -> Image.Image:
-    """Generate a placeholder image for a given modality (MPM-FLIM, confocal, RCM)."""
-    rng = np.random.RandomState(hash(biopsy_id + modality) % 2**32)
-    # Different color schemes per modality
+) -> np.ndarray:
+    """Generate an (H, W, 3) uint8 placeholder image for a given modality (MPM-FLIM, confocal, RCM)."""
+    rng = _seeded_rng(biopsy_id, modality)
+    # Different color schemes per modality; sample uint8 directly (no float round-trip)
     if modality == "MPM-FLIM":
-        # Fluorescence lifetime style: green/teal
-        r = (rng.random((height, width)) * 40).astype(np.uint8)
-        g = (150 + rng.random((height, width)) * 80).astype(np.uint8)
-        b = (120 + rng.random((height, width)) * 60).astype(np.uint8)
+        # Fluorescence lifetime style: green/teal; per-channel (low, high) for R, G, B
+        # broadcast over the last axis, so one call fills a contiguous (H, W, 3) buffer
+        low = np.array([0, 150, 120], dtype=np.uint8)
+        high = np.array([40, 230, 180], dtype=np.uint8)
+        arr = _apply_gradient(rng.integers(low, high, size=(height, width, 3), dtype=np.uint8))
     elif modality == "confocal":
-        # Reflectance style: grayscale
-        g = (80 + rng.random((height, width)) * 120).astype(np.uint8)
-        r = b = g
+        # Reflectance style: grayscale; shade the single channel, then replicate it to RGB
+        g = rng.integers(80, 200, size=(height, width, 1), dtype=np.uint8)
+        arr = np.repeat(_apply_gradient(g), 3, axis=2)
     else:  # RCM
-        # Confocal reflectance style: warm gray
-        g = (100 + rng.random((height, width)) * 100).astype(np.uint8)
-        r = (g + 20).clip(0, 255).astype(np.uint8)
-        b = (g - 10).clip(0, 255).astype(np.uint8)
-    arr = np.stack([r, g, b], axis=-1)
-    # Add simple "tissue-like" gradient; shape (H, W, 1) so it broadcasts with (H, W, 3)
-    y = np.linspace(0, 1, height).reshape(-1, 1)
-    y = np.broadcast_to(y, (height, width))
-    factor = (0.7 + 0.3 * y)[..., np.newaxis]
-    arr = (arr * factor).clip(0, 255).astype(np.uint8)
-    return Image.fromarray(arr)
+        # Confocal reflectance style: warm gray; g in [100, 200) so +20/-10 stay in uint8
+        g = rng.integers(100, 200, size=(height, width), dtype=np.uint8)
+        arr = np.empty((height, width, 3), dtype=np.uint8)
+        np.add(g, 20, out=arr[..., 0])
+        arr[..., 1] = g
+        np.subtract(g, 10, out=arr[..., 2])
+        arr = _apply_gradient(arr)
+    return arr